@@ -1,25 +1,47 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
 
+from convert import daily_counts, ensure_parquet
+
 st.set_page_config(
     page_title="John Lewis Ad – YouTube Comment Analysis",
     layout="wide"
 )
 
+# Only the columns the dashboard actually uses are read from disk
+USECOLS = [
+    "author",
+    "clean_text",
+    "published_at",
+    "likes",
+    "topic_label",
+    "sentiment_label",
+    "sentiment_score",
+    "date",
+]
+
 @st.cache_data
 def load_data():
-    df = pd.read_csv("data/all_comments_with_topics_and_sentiment.csv")
+    # published_at (UTC) and date are already typed in the Parquet file (see convert.py)
+    # (rebuilt from the CSV first if the CSV has changed since the last conversion).
+    # The pyarrow backend also keeps author/clean_text as Arrow strings
+    # (pd.ArrowDtype(pa.string())), not per-row Python objects.
+    df = pd.read_parquet(ensure_parquet(), columns=USECOLS, dtype_backend="pyarrow")
 
-    # Parse datetime with UTC awareness, then make a plain date column
-    if "published_at" in df.columns:
-        df["published_at"] = pd.to_datetime(df["published_at"], errors="coerce", utc=True)
-        df["date"] = df["published_at"].dt.date
-    else:
-        df["date"] = None
+    # Low-cardinality labels: compare/group on integer codes instead of strings
+    for col in ("topic_label", "sentiment_label"):
+        df[col] = df[col].astype("category")
 
-    return df
+    # Count tables over the whole dataset, sliced at query time instead of regrouping
+    daily = daily_counts(df)
+    topic_sent = pd.crosstab(df["topic_label"], df["sentiment_label"]).astype("int32")
 
-df = load_data()
+    return df, daily, topic_sent
+
+df, daily, topic_sent = load_data()
 
 st.title("John Lewis Christmas Ad – YouTube NLP Analysis")
 
@@ -37,13 +59,18 @@ Use the filters in the sidebar to explore how audiences reacted.
 # =========================
 st.sidebar.header("Filters")
 
+# Option lists come from the (already sorted) categories and are kept in
+# session_state, so later reruns don't rebuild them
+if "topic_options" not in st.session_state:
+    st.session_state["topic_options"] = ["All"] + df["topic_label"].cat.categories.tolist()
+if "sentiment_options" not in st.session_state:
+    st.session_state["sentiment_options"] = ["All"] + df["sentiment_label"].cat.categories.tolist()
+
 # Topic filter
-topic_options = ["All"] + sorted(df["topic_label"].dropna().unique().tolist())
-chosen_topic = st.sidebar.selectbox("Topic", topic_options)
+chosen_topic = st.sidebar.selectbox("Topic", st.session_state["topic_options"])
 
 # Sentiment filter
-sentiment_options = ["All"] + sorted(df["sentiment_label"].dropna().unique().tolist())
-chosen_sentiment = st.sidebar.selectbox("Sentiment", sentiment_options)
+chosen_sentiment = st.sidebar.selectbox("Sentiment", st.session_state["sentiment_options"])
 
 # Date range filter (using df['date'], not the timezone-aware timestamp)
 if "date" in df.columns and df["date"].notna().any():
@@ -59,19 +86,111 @@ else:
 # =========================
 # APPLY FILTERS
 # =========================
-filtered = df.copy()
+# Everything below is cached on the (topic, sentiment, start, end) filter
+# tuple, so a rerun with unchanged filters skips the pandas work entirely.
+@st.cache_data
+def filter_index(topic, sentiment, start, end):
+    # Combine all filters into one boolean mask; return matching row positions
+    mask = np.ones(len(df), dtype=bool)
+
+    if topic != "All":
+        mask &= df["topic_label"].eq(topic).to_numpy()
+
+    if sentiment != "All":
+        mask &= df["sentiment_label"].eq(sentiment).to_numpy()
+
+    if start and end and "date" in df.columns:
+        mask &= df["date"].between(start, end).to_numpy(dtype=bool, na_value=False)
+
+    return np.flatnonzero(mask)
+
+
+def filtered_view(*filters):
+    return df.iloc[filter_index(*filters)]
+
+
+def code_counts(col):
+    # Tally categorical codes with np.bincount instead of hashing the labels
+    codes = col.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(col.cat.categories))
+    return pd.Series(counts, index=col.cat.categories.rename(col.name), name="count")
+
+
+def covers_all_rows(start, end):
+    # True when the precomputed tables count every row the filters keep: the
+    # crosstab must not have dropped rows (e.g. missing topic), and the date
+    # filter must not exclude any row
+    if topic_sent.to_numpy().sum() != len(df):
+        return False
+    if not (start and end):
+        return True
+    return (
+        start <= daily.index.min() and end >= daily.index.max()
+        and daily.to_numpy().sum() == len(df)
+    )
+
+
+@st.cache_data
+def topic_counts(topic, sentiment, start, end):
+    if not covers_all_rows(start, end):
+        filtered = filtered_view(topic, sentiment, start, end)
+        counts = code_counts(filtered["topic_label"])
+    else:
+        sub = topic_sent if sentiment == "All" else topic_sent[[sentiment]]
+        counts = sub.sum(axis=1).rename("count")
+        if topic != "All":
+            counts = counts.where(counts.index == topic, 0)
+
+    # Only labels actually present, like value_counts() on plain strings
+    return counts[counts > 0].sort_values(ascending=False)
+
+
+@st.cache_data
+def sentiment_counts(topic, sentiment, start, end):
+    if not covers_all_rows(start, end):
+        filtered = filtered_view(topic, sentiment, start, end)
+        counts = code_counts(filtered["sentiment_label"])
+    else:
+        sub = topic_sent if topic == "All" else topic_sent.loc[[topic]]
+        counts = sub.sum(axis=0).rename("count")
+        if sentiment != "All":
+            counts = counts.where(counts.index == sentiment, 0)
+
+    # Only labels actually present, like value_counts() on plain strings
+    return counts[counts > 0].sort_values(ascending=False)
 
-if chosen_topic != "All":
-    filtered = filtered[filtered["topic_label"] == chosen_topic]
 
-if chosen_sentiment != "All":
-    filtered = filtered[filtered["sentiment_label"] == chosen_sentiment]
+@st.cache_data
+def sentiment_over_time(topic, sentiment, start, end):
+    if topic == "All":
+        # Only date/sentiment filters: slice rows and columns of the daily table
+        sent_time = daily.loc[start:end] if start and end else daily
+        if sentiment != "All":
+            sent_time = sent_time[[sentiment]]
+    else:
+        filtered = filtered_view(topic, sentiment, start, end)
+        sent_time = daily_counts(filtered, daily.index.to_numpy(dtype="datetime64[D]"))
+
+    # Match groupby(observed=True): drop days and sentiments with no comments
+    return sent_time.loc[sent_time.any(axis=1), sent_time.any(axis=0)]
 
-if start_date and end_date and "date" in filtered.columns:
-    filtered = filtered[
-        (filtered["date"] >= start_date) &
-        (filtered["date"] <= end_date)
-    ]
+
+@st.cache_data
+def to_csv_bytes(*filters):
+    # pyarrow's C++ CSV writer, straight to bytes (no intermediate str)
+    table = pa.Table.from_pandas(filtered_view(*filters), preserve_index=False)
+    # Timestamps are whole seconds; write them that way, not with 9 zero decimals
+    i = table.schema.get_field_index("published_at")
+    table = table.set_column(
+        i, "published_at", table["published_at"].cast(pa.timestamp("s", tz="UTC"), safe=False)
+    )
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(table, buf)
+    return buf.getvalue().to_pybytes()
+
+
+filters = (chosen_topic, chosen_sentiment, start_date, end_date)
+filtered = filtered_view(*filters)
 
 st.write(f"Showing **{len(filtered)}** comments after filters.")
 
@@ -85,10 +204,11 @@ col1, col2, col3 = st.columns(3)
 # Total comments
 col1.metric("Total comments", len(filtered))
 
-# Positive / Negative %
+# Positive / Negative % from one tally of sentiment codes
 if len(filtered) > 0:
-    pos_pct = (filtered["sentiment_label"] == "POSITIVE").mean() * 100
-    neg_pct = (filtered["sentiment_label"] == "NEGATIVE").mean() * 100
+    sent_counts = sentiment_counts(*filters)
+    pos_pct = sent_counts.get("POSITIVE", 0) / len(filtered) * 100
+    neg_pct = sent_counts.get("NEGATIVE", 0) / len(filtered) * 100
 else:
     pos_pct, neg_pct = 0.0, 0.0
 
@@ -105,16 +225,14 @@ col_a, col_b = st.columns(2)
 with col_a:
     st.markdown("**Topic distribution (by comments)**")
     if "topic_label" in filtered.columns and len(filtered) > 0:
-        topic_counts = filtered["topic_label"].value_counts().sort_values(ascending=False)
-        st.bar_chart(topic_counts)
+        st.bar_chart(topic_counts(*filters))
     else:
         st.write("No topic data available for current filters.")
 
 with col_b:
     st.markdown("**Sentiment distribution**")
     if "sentiment_label" in filtered.columns and len(filtered) > 0:
-        sent_counts = filtered["sentiment_label"].value_counts()
-        st.bar_chart(sent_counts)
+        st.bar_chart(sentiment_counts(*filters))
     else:
         st.write("No sentiment data available for current filters.")
 
@@ -123,12 +241,7 @@ with col_b:
 # =========================
 if "date" in filtered.columns and filtered["date"].notna().any():
     st.subheader("Sentiment over time (daily)")
-    tmp = filtered.copy()
-    sent_time = (
-        tmp.groupby(["date", "sentiment_label"])
-           .size()
-           .unstack(fill_value=0)
-    )
+    sent_time = sentiment_over_time(*filters)
     if not sent_time.empty:
         st.line_chart(sent_time)
     else:
@@ -156,10 +269,14 @@ st.dataframe(filtered[show_cols].head(200))
 # =========================
 st.subheader("Download Filtered Data")
 
-csv_bytes = filtered.to_csv(index=False).encode("utf-8")
-st.download_button(
-    label="Download current view as CSV",
-    data=csv_bytes,
-    file_name="youtube_comments_filtered.csv",
-    mime="text/csv"
-)
\ No newline at end of file
+# Only build the CSV once asked for, and only for the filters it was asked for
+if st.button("Prepare CSV of current view"):
+    st.session_state["csv_filters"] = filters
+
+if st.session_state.get("csv_filters") == filters:
+    st.download_button(
+        label="Download current view as CSV",
+        data=to_csv_bytes(*filters),
+        file_name="youtube_comments_filtered.csv",
+        mime="text/csv"
+    )
@@ -1,77 +1,93 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use("Agg")  # Use non-interactive backend (safe for scripts/servers)
 import matplotlib.pyplot as plt
 
+from convert import daily_counts, ensure_parquet
+
 
 # ---------- CONFIG ----------
 
-INPUT_CSV = "all_comments_with_topics_and_sentiment.csv"
+USECOLS = ["topic_label", "sentiment_label", "date"]  # all the plots need
 OUTPUT_DIR = Path("charts")
+# Dashboard-sized PNGs with fast (low) zlib compression keep savefig cheap
+SAVE_KWARGS = {"dpi": 72, "format": "png", "pil_kwargs": {"compress_level": 1}}
 OUTPUT_DIR.mkdir(exist_ok=True)
 
 
 # ---------- HELPER: LOAD & PREP DATA ----------
 
-def load_data(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+def load_data(parquet_path: Path) -> pd.DataFrame:
+    # published_at (UTC) and date are already typed in the Parquet file (see convert.py)
+    df = pd.read_parquet(parquet_path, columns=USECOLS, dtype_backend="pyarrow")
 
-    # Parse datetime if present
-    if "published_at" in df.columns:
-        df["published_at"] = pd.to_datetime(df["published_at"], errors="coerce", utc=True)
-        df["date"] = df["published_at"].dt.date
-    else:
-        df["date"] = pd.NaT
+    # Low-cardinality labels: compare/group on integer codes instead of strings
+    for col in ("topic_label", "sentiment_label"):
+        df[col] = df[col].astype("category")
 
     return df
 
 
+# ---------- HELPER: REUSE ONE FIGURE ----------
+
+def start_chart(fig: plt.Figure, figsize: tuple) -> plt.Axes:
+    # Wipe the shared figure and resize it, keeping the canvas and backend state
+    fig.clear()
+    fig.set_size_inches(*figsize)
+    return fig.add_subplot()
+
+
+def save_chart(fig: plt.Figure, out_path: Path) -> None:
+    fig.tight_layout()
+    fig.savefig(out_path, **SAVE_KWARGS)
+    fig.clear()
+
+
 # ---------- PLOT 1: OVERALL SENTIMENT ----------
 
-def plot_overall_sentiment(df: pd.DataFrame, out_path: Path) -> None:
+def plot_overall_sentiment(df: pd.DataFrame, out_path: Path, fig: plt.Figure) -> None:
     if "sentiment_label" not in df.columns:
         print("No 'sentiment_label' column found. Skipping overall sentiment chart.")
         return
 
-    counts = df["sentiment_label"].value_counts().sort_index()
-    plt.figure(figsize=(6, 4))
-    counts.plot(kind="bar")
-    plt.title("Overall Sentiment Distribution")
-    plt.xlabel("Sentiment")
-    plt.ylabel("Number of Comments")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    # Categories are already sorted, so the unsorted counts come out in label order
+    counts = df["sentiment_label"].value_counts(sort=False)
+    ax = start_chart(fig, (6, 4))
+    counts.plot(kind="bar", ax=ax)
+    ax.set_title("Overall Sentiment Distribution")
+    ax.set_xlabel("Sentiment")
+    ax.set_ylabel("Number of Comments")
+    save_chart(fig, out_path)
     print(f"Saved overall sentiment chart -> {out_path}")
 
 
 # ---------- PLOT 2: TOPIC DISTRIBUTION ----------
 
-def plot_topic_distribution(df: pd.DataFrame, out_path: Path) -> None:
+def plot_topic_distribution(df: pd.DataFrame, out_path: Path, fig: plt.Figure) -> None:
     if "topic_label" not in df.columns:
         print("No 'topic_label' column found. Skipping topic distribution chart.")
         return
 
-    topic_counts = df["topic_label"].value_counts().sort_values(ascending=False)
-
-    plt.figure(figsize=(8, 4))
-    topic_counts.plot(kind="bar")
-    plt.title("Topic Distribution (Share of Comments per Topic)")
-    plt.xlabel("Topic")
-    plt.ylabel("Number of Comments")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    topic_counts = df["topic_label"].value_counts(sort=True, ascending=False)
+
+    ax = start_chart(fig, (8, 4))
+    topic_counts.plot(kind="bar", ax=ax)
+    ax.set_title("Topic Distribution (Share of Comments per Topic)")
+    ax.set_xlabel("Topic")
+    ax.set_ylabel("Number of Comments")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    save_chart(fig, out_path)
     print(f"Saved topic distribution chart -> {out_path}")
 
 
 # ---------- PLOT 3: SENTIMENT BY TOPIC (STACKED BAR) ----------
 
-def plot_sentiment_by_topic(df: pd.DataFrame, out_path: Path) -> None:
+def plot_sentiment_by_topic(df: pd.DataFrame, out_path: Path, fig: plt.Figure) -> None:
     if "topic_label" not in df.columns or "sentiment_label" not in df.columns:
         print("Missing 'topic_label' or 'sentiment_label'. Skipping sentiment-by-topic chart.")
         return
@@ -81,107 +97,126 @@ def plot_sentiment_by_topic(df: pd.DataFrame, out_path: Path) -> None:
     # Convert to percentages by row
     crosstab_pct = crosstab.div(crosstab.sum(axis=1), axis=0) * 100
 
-    plt.figure(figsize=(8, 5))
-    bottom = None
-    for sentiment in sorted(crosstab_pct.columns):
-        values = crosstab_pct[sentiment]
-        if bottom is None:
-            plt.bar(crosstab_pct.index, values, label=sentiment)
-            bottom = values
-        else:
-            plt.bar(crosstab_pct.index, values, bottom=bottom, label=sentiment)
-            bottom = bottom + values
-
-    plt.title("Sentiment within Each Topic (Stacked %)")
-    plt.xlabel("Topic")
-    plt.ylabel("Percentage of Comments")
-    plt.xticks(rotation=45, ha="right")
-    plt.legend(title="Sentiment")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    sentiments = sorted(crosstab_pct.columns)
+    values = crosstab_pct[sentiments].to_numpy()
+    # Each layer sits on the running total of the layers before it
+    bottoms = np.cumsum(values, axis=1) - values
+
+    ax = start_chart(fig, (8, 5))
+    for i, sentiment in enumerate(sentiments):
+        ax.bar(crosstab_pct.index, values[:, i], bottom=bottoms[:, i], label=sentiment)
+
+    ax.set_title("Sentiment within Each Topic (Stacked %)")
+    ax.set_xlabel("Topic")
+    ax.set_ylabel("Percentage of Comments")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    ax.legend(title="Sentiment")
+    save_chart(fig, out_path)
     print(f"Saved sentiment-by-topic chart -> {out_path}")
 
 
 # ---------- PLOT 4: COMMENTS PER DAY ----------
 
-def plot_comments_per_day(df: pd.DataFrame, out_path: Path) -> None:
+def plot_comments_per_day(df: pd.DataFrame, out_path: Path, fig: plt.Figure) -> None:
     if "date" not in df.columns or df["date"].isna().all():
         print("No 'date' column or all dates NaT. Skipping comments-per-day chart.")
         return
 
-    counts = df.groupby("date").size()
-
-    plt.figure(figsize=(8, 4))
-    counts.plot(kind="bar")
-    plt.title("Number of Comments per Day")
-    plt.xlabel("Date")
-    plt.ylabel("Number of Comments")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    counts = df["date"].value_counts(sort=False).sort_index()
+
+    # One vectorized bar call on plain arrays instead of pandas' bar plotting
+    x = np.arange(len(counts))
+    ax = start_chart(fig, (8, 4))
+    ax.bar(x, counts.to_numpy(), width=0.5)
+    ax.set_title("Number of Comments per Day")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Comments")
+    ax.set_xticks(x, counts.index.astype(str), rotation=45, ha="right")
+    save_chart(fig, out_path)
     print(f"Saved comments-per-day chart -> {out_path}")
 
 
 # ---------- PLOT 5: SENTIMENT OVER TIME (LINE) ----------
 
-def plot_sentiment_over_time(df: pd.DataFrame, out_path: Path) -> None:
+def plot_sentiment_over_time(df: pd.DataFrame, out_path: Path, fig: plt.Figure) -> None:
     if "date" not in df.columns or df["date"].isna().all() or "sentiment_label" not in df.columns:
         print("Missing 'date' or 'sentiment_label'. Skipping sentiment-over-time chart.")
         return
 
-    tmp = df.copy()
-    # Group by date and sentiment, then unstack to get columns POSITIVE/NEGATIVE
-    counts = (
-        tmp.groupby(["date", "sentiment_label"])
-           .size()
-           .unstack(fill_value=0)
-           .sort_index()
-    )
+    # Days x sentiments table of daily counts; drop sentiments never seen
+    counts = daily_counts(df)
+    counts = counts.loc[:, counts.any()]
 
     if counts.empty:
         print("No data after grouping for sentiment-over-time. Skipping chart.")
         return
 
-    plt.figure(figsize=(8, 4))
+    ax = start_chart(fig, (8, 4))
     for col in counts.columns:
-        plt.plot(counts.index, counts[col], marker="o", label=col)
-
-    plt.title("Sentiment Over Time (Daily Counts)")
-    plt.xlabel("Date")
-    plt.ylabel("Number of Comments")
-    plt.xticks(rotation=45, ha="right")
-    plt.legend(title="Sentiment")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+        ax.plot(counts.index, counts[col], marker="o", label=col)
+
+    ax.set_title("Sentiment Over Time (Daily Counts)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Comments")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    ax.legend(title="Sentiment")
+    save_chart(fig, out_path)
     print(f"Saved sentiment-over-time chart -> {out_path}")
 
 
-# ---------- MAIN ----------
+# ---------- PARALLEL WORKERS ----------
 
-def main():
-    if not Path(INPUT_CSV).exists():
-        raise FileNotFoundError(f"Could not find {INPUT_CSV} in current directory.")
+# (plotter, output file) for every chart
+PLOTS = [
+    (plot_overall_sentiment, "overall_sentiment.png"),      # 1. Overall sentiment
+    (plot_topic_distribution, "topic_distribution.png"),    # 2. Topic distribution
+    (plot_sentiment_by_topic, "sentiment_by_topic.png"),    # 3. Sentiment within each topic
+    (plot_comments_per_day, "comments_per_day.png"),        # 4. Comments per day
+    (plot_sentiment_over_time, "sentiment_over_time.png"),  # 5. Sentiment over time
+]
+
+# Per-process state, set up once by init_worker
+_worker_df = None
+_worker_fig = None
 
-    df = load_data(INPUT_CSV)
 
-    # 1. Overall sentiment
-    plot_overall_sentiment(df, OUTPUT_DIR / "overall_sentiment.png")
+def init_worker(parquet_path: Path) -> None:
+    # Each worker reads the (small, fast) Parquet file itself and keeps one
+    # figure that every chart it renders clears and reuses
+    global _worker_df, _worker_fig
+    _worker_df = load_data(parquet_path)
+    _worker_fig = plt.figure()
 
-    # 2. Topic distribution
-    plot_topic_distribution(df, OUTPUT_DIR / "topic_distribution.png")
 
-    # 3. Sentiment within each topic (stacked bar)
-    plot_sentiment_by_topic(df, OUTPUT_DIR / "sentiment_by_topic.png")
+def render_chart(plot: tuple) -> None:
+    plotter, file_name = plot
+    plotter(_worker_df, OUTPUT_DIR / file_name, _worker_fig)
 
-    # 4. Comments per day
-    plot_comments_per_day(df, OUTPUT_DIR / "comments_per_day.png")
 
-    # 5. Sentiment over time
-    plot_sentiment_over_time(df, OUTPUT_DIR / "sentiment_over_time.png")
+# ---------- MAIN ----------
+
+def main():
+    parquet_path = ensure_parquet()
+    if not parquet_path.exists():
+        raise FileNotFoundError(f"Could not find {parquet_path} or the CSV it is built from.")
+
+    # The charts share no state, so render them in parallel processes when
+    # there is more than one core; with one, a pool only adds startup cost
+    max_workers = min(len(PLOTS), os.cpu_count() or 1)
+    if max_workers == 1:
+        init_worker(parquet_path)
+        for plot in PLOTS:
+            render_chart(plot)
+        plt.close(_worker_fig)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        initargs=(parquet_path,),
+    ) as executor:
+        list(executor.map(render_chart, PLOTS))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()